@@ -6,15 +6,84 @@ Parsing and assembly functions for all CCSDS protocol layers
 """
 
 from Crypto.Cipher import DES
-from tools import get_bits, get_bits_int
+from struct import unpack_from
+from tools import crc16_ccitt
 import os
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def parse_vcdu_headers(data):
+    """
+    Parses headers of concatenated VCDUs in bulk
+
+    Returns (SCID, VCID, COUNTER) sequences with one element per 892 byte
+    VCDU, using vectorised NumPy when available. Useful for scanning VCDU
+    dump files without constructing a VCDU object per packet.
+
+    :param data: Buffer of concatenated 892 byte VCDUs
+    """
+
+    count = len(data) // 892
+
+    if numpy != None:
+        packets = numpy.frombuffer(data, dtype=numpy.uint8, count=count * 892).reshape(count, 892)
+
+        scid = ((packets[:, 0].astype(numpy.uint16) << 2) | (packets[:, 1] >> 6)) & 0xFF
+        vcid = packets[:, 1] & 0x3F
+        counter = ((packets[:, 2].astype(numpy.uint32) << 16) |
+                   (packets[:, 3].astype(numpy.uint32) << 8) |
+                   packets[:, 4])
+
+        return scid, vcid, counter
+
+    # Scalar fallback without NumPy
+    scid = []
+    vcid = []
+    counter = []
+
+    for i in range(0, count * 892, 892):
+        scid.append(((data[i] << 2) | (data[i + 1] >> 6)) & 0xFF)
+        vcid.append(data[i + 1] & 0x3F)
+        counter.append((data[i + 2] << 16) | (data[i + 3] << 8) | data[i + 4])
+
+    return scid, vcid, counter
+
+
+# Precomputed hex strings for the 11-bit M_PDU pointer field
+POINTER_HEX = tuple(format(i, 'X') for i in range(2048))
+
 
 class VCDU:
     """
     Parses CCSDS Virtual Channel Data Unit (VCDU)
     """
 
+    # Spacecraft names by ID
+    SC_NAMES = {
+        195: "COMS-1"
+    }
+
+    # Virtual Channel names by ID
+    VC_NAMES = {
+        0:  "VIS",
+        1:  "SWIR",
+        2:  "WV",
+        3:  "IR1",
+        4:  "IR2",
+        5:  "ANT",
+        6:  "ENC",
+        7:  "CMDPS",
+        8:  "NWP",
+        9:  "GOCI",
+        10: "BINARY",
+        11: "TYPHOON",
+        63: "FILL"
+    }
+
     def __init__(self, data):
         self.data = data
         self.parse()
@@ -24,15 +93,15 @@ class VCDU:
         Parse VCDU header fields
         """
 
-        header = self.data[:6]
+        header = int.from_bytes(self.data[:6], byteorder='big')
 
         # Header fields
-        self.VER = get_bits_int(header, 0, 2, 48)           # Virtual Channel Version
-        self.SCID = get_bits_int(header, 2, 8, 48)          # Spacecraft ID
-        self.VCID = get_bits_int(header, 10, 6, 48)         # Virtual Channel ID
-        self.COUNTER = get_bits_int(header, 16, 24, 48)     # VCDU Counter
-        self.REPLAY = get_bits_int(header, 40, 1, 48)       # Replay Flag
-        self.SPARE = get_bits_int(header, 41, 7, 48)        # Spare (always b0000000)
+        self.VER = header >> 46                             # Virtual Channel Version
+        self.SCID = (header >> 38) & 0xFF                   # Spacecraft ID
+        self.VCID = (header >> 32) & 0x3F                   # Virtual Channel ID
+        self.COUNTER = (header >> 8) & 0xFFFFFF             # VCDU Counter
+        self.REPLAY = (header >> 7) & 0x01                  # Replay Flag
+        self.SPARE = header & 0x7F                          # Spare (always b0000000)
 
         # Spacecraft and virtual channel names
         self.SC = self.get_SC(self.SCID)
@@ -46,37 +115,14 @@ class VCDU:
         Get name of spacecraft by ID
         """
 
-        scname = {}
-        scname[195] = "COMS-1"
+        return self.SC_NAMES.get(scid)
 
-        try:
-            return scname[scid]
-        except KeyError:
-            return None
-    
     def get_VC(self, vcid):
         """
         Get name of Virtual Channel by ID
         """
-        vcname = {}
-        vcname[0] = "VIS"
-        vcname[1] = "SWIR"
-        vcname[2] = "WV"
-        vcname[3] = "IR1"
-        vcname[4] = "IR2"
-        vcname[5] = "ANT"
-        vcname[6] = "ENC"
-        vcname[7] = "CMDPS"
-        vcname[8] = "NWP"
-        vcname[9] = "GOCI"
-        vcname[10] = "BINARY"
-        vcname[11] = "TYPHOON"
-        vcname[63] = "FILL"
 
-        try:
-            return vcname[vcid]
-        except KeyError:
-            return None
+        return self.VC_NAMES.get(vcid)
 
     def print_info(self):
         """
@@ -100,19 +146,20 @@ class M_PDU:
         Parse M_PDU header fields
         """
 
-        header = self.data[:2]
+        header = int.from_bytes(self.data[:2], byteorder='big')
 
         # Header fields
-        #self.SPARE = get_bits(header, 0, 5, 16)            # Spare Field (always b00000)
-        self.POINTER = get_bits_int(header, 5, 11, 16)      # First Pointer Header
+        #self.SPARE = header >> 11                          # Spare Field (always b00000)
+        self.POINTER = header & 0x07FF                      # First Pointer Header
 
         # Detect if M_PDU contains CP_PDU header
         if self.POINTER != 2047:  # 0x07FF
             self.HEADER = True
         else:
             self.HEADER = False
-        
-        self.PACKET = self.data[2:]
+
+        # Zero-copy view of the packet zone (slicing a view never copies the buffer)
+        self.PACKET = memoryview(self.data)[2:]
     
     def print_info(self):
         """
@@ -120,7 +167,7 @@ class M_PDU:
         """
 
         if self.HEADER:
-            print("    [M_PDU] HEADER: 0x{}".format(hex(self.POINTER)[2:].upper()))
+            print("    [M_PDU] HEADER: 0x{}".format(POINTER_HEX[self.POINTER]))
         else:
             print("    [M_PDU]")
 
@@ -140,34 +187,35 @@ class CP_PDU:
         Parse CP_PDU header fields
         """
 
-        header = self.data[:6]
+        header = int.from_bytes(self.data[:6], byteorder='big')
 
         # Header fields
-        self.VER = get_bits(header, 0, 3, 48)                   # Version (always b000)
-        self.TYPE = get_bits(header, 3, 1, 48)                  # Type (always b0)
-        self.SHF = get_bits(header, 4, 1, 48)                   # Secondary Header Flag
-        self.APID = get_bits_int(header, 5, 11, 48)             # Application Process ID
-        self.SEQ = get_bits_int(header, 16, 2, 48)              # Sequence Flag
-        self.COUNTER = get_bits_int(header, 18, 14, 48)         # Packet Sequence Counter
-        self.LENGTH = get_bits_int(header, 32, 16, 48) + 1      # Packet Length
+        self.VER = header >> 45                                 # Version (always b000)
+        self.TYPE = (header >> 44) & 0x01                       # Type (always b0)
+        self.SHF = (header >> 43) & 0x01                        # Secondary Header Flag
+        self.APID = (header >> 32) & 0x07FF                     # Application Process ID
+        self.SEQ = (header >> 30) & 0x03                        # Sequence Flag
+        self.COUNTER = (header >> 16) & 0x3FFF                  # Packet Sequence Counter
+        self.LENGTH = (header & 0xFFFF) + 1                     # Packet Length
 
         # Parse sequence flag
         seqn = ["CONTINUE", "FIRST", "LAST", "SINGLE"]
         self.SEQ = seqn[self.SEQ]
 
-        # Add post-header data to payload
-        self.PAYLOAD = self.data[6:]
-    
+        # Add post-header data to payload (bytearray keeps appends amortised O(1),
+        # and copying out of a memoryview here unpins the underlying packet buffer)
+        self.PAYLOAD = bytearray(memoryview(self.data)[6:])
+
     def append(self, data):
         """
         Append data to CP_PDU payload
         """
 
-        self.PAYLOAD += data
+        self.PAYLOAD.extend(data)
 
-    def finish(self, data, crclut):
+    def finish(self, data):
         """
-        Finish CP_PDU by checking length and CRC 
+        Finish CP_PDU by checking length and CRC
         """
 
         # Append last chunk of data
@@ -181,7 +229,7 @@ class CP_PDU:
             lenok = True
         
         # Check payload CRC against expected CRC
-        if not self.CRC(crclut):
+        if not self.CRC():
             crcok = False
         else:
             crcok = True
@@ -204,23 +252,21 @@ class CP_PDU:
         else:
             return False
     
-    def CRC(self, lut):
+    def CRC(self):
         """
-        Calculate CRC-16/CCITT-FALSE 
+        Calculate CRC-16/CCITT-FALSE
         """
 
-        initial = 0xFFFF
-        crc = initial
-        data = self.PAYLOAD[:-2]
-        txCRC = self.PAYLOAD[-2:]
+        # memoryview slices avoid copying the payload just to CRC it
+        payload = memoryview(self.PAYLOAD)
+        data = payload[:-2]
+        txCRC = payload[-2:]
 
         # Calculate CRC
-        for i in range(len(data)):
-            lutPos = ((crc >> 8) ^ data[i]) & 0xFFFF
-            crc = ((crc << 8) ^ lut[lutPos]) & 0xFFFF
+        crc = crc16_ccitt(data)
 
         # Compare CRC from CP_PDU and calculated CRC
-        if int(crc) == int.from_bytes(txCRC, byteorder='big'):
+        if crc == int.from_bytes(txCRC, byteorder='big'):
             return True
         else:
             return False
@@ -238,47 +284,74 @@ class TP_File:
     Parses and assembles CCSDS Transport Files (TP_File)
     """
 
+    # Image bands by file counter decade (1-10 VIS, 11-20 SWIR, ...)
+    BANDS = ("VIS", "SWIR", "WV", "IR1", "IR2")
+
+    # Upper bound for preallocating the payload from the header length field,
+    # so a corrupted 64-bit length can't trigger a huge allocation
+    PREALLOC_LIMIT = 64 * 1024 * 1024
+
     def __init__(self, data):
         self.data = data
         self.PAYLOAD = None
         self.parse()
-    
+
     def parse(self):
         """
         Parse TP_File header fields
         """
 
-        header = self.data[:10]
+        header = int.from_bytes(self.data[:10], byteorder='big')
 
         # Header fields
-        self.COUNTER = get_bits_int(header, 0, 16, 80)                # File Counter
-        self.LENGTH = int(get_bits_int(header, 16, 64, 80)/8)         # File Length
+        self.COUNTER = header >> 64                         # File Counter
+        self.LENGTH = (header & 0xFFFFFFFFFFFFFFFF) // 8    # File Length (bits to bytes)
+
+        # Preallocate payload to its final size so appends are single
+        # writes into the buffer rather than repeated growth
+        if 0 < self.LENGTH <= self.PREALLOC_LIMIT:
+            self.PAYLOAD = bytearray(self.LENGTH)
+        else:
+            self.PAYLOAD = bytearray()
+        self.rxLength = 0
 
         # Add post-header data to payload
-        self.PAYLOAD = self.data[10:]
-    
+        self.append(memoryview(self.data)[10:])
+
     def append(self, data):
         """
         Append data to TP_File payload
         """
 
-        self.PAYLOAD += data
+        end = self.rxLength + len(data)
+
+        if end <= len(self.PAYLOAD):
+            # Write into preallocated buffer
+            self.PAYLOAD[self.rxLength:end] = data
+        else:
+            # More data than the header promised, grow the buffer
+            del self.PAYLOAD[self.rxLength:]
+            self.PAYLOAD.extend(data)
+
+        self.rxLength = end
 
     def finish(self, data):
         """
-        Finish CP_PDU by checking length
+        Finish TP_File by checking length
         """
 
         # Append last chunk of data
         self.append(data)
 
+        # Trim unfilled preallocated space (only present on short files)
+        del self.PAYLOAD[self.rxLength:]
+
         # Check payload length against expected length
-        plen = len(self.PAYLOAD)
-        if plen != self.LENGTH:
+        if self.rxLength != self.LENGTH:
             lenok = False
         else:
             lenok = True
-        
+
         return lenok
     
     def print_info(self):
@@ -287,21 +360,9 @@ class TP_File:
         """
 
         # Get image band based on file counter
-        if 1 <= self.COUNTER <= 10:
-            band = "VIS"
-            num = self.COUNTER
-        elif 11 <= self.COUNTER <= 20:
-            band = "SWIR"
-            num = self.COUNTER - 10
-        elif 21 <= self.COUNTER <= 30:
-            band = "WV"
-            num = self.COUNTER - 20
-        elif 31 <= self.COUNTER <= 40:
-            band = "IR1"
-            num = self.COUNTER - 30
-        elif 41 <= self.COUNTER <= 50:
-            band = "IR2"
-            num = self.COUNTER - 40
+        if 1 <= self.COUNTER <= 50:
+            band = self.BANDS[(self.COUNTER - 1) // 10]
+            num = ((self.COUNTER - 1) % 10) + 1
         else:
             band = "Other"
             num = "?"
@@ -341,14 +402,14 @@ class S_PDU:
         Parses xRIT primary and key headers
         """
         
-        primaryHeader = self.data[:16]
+        primaryHeader = int.from_bytes(self.data[:16], byteorder='big')
 
         # Header fields
-        HEADER_TYPE = get_bits_int(primaryHeader, 0, 8, 128)               # File Counter (always 0x00)
-        HEADER_LEN = get_bits_int(primaryHeader, 8, 16, 128)               # Header Length (always 0x10)
-        FILE_TYPE = get_bits_int(primaryHeader, 24, 8, 128)                # File Type
-        TOTAL_HEADER_LEN = get_bits_int(primaryHeader, 32, 32, 128)        # Total xRIT Header Length
-        DATA_LEN = get_bits_int(primaryHeader, 64, 64, 128)                # Data Field Length
+        HEADER_TYPE = primaryHeader >> 120                                 # File Counter (always 0x00)
+        HEADER_LEN = (primaryHeader >> 104) & 0xFFFF                       # Header Length (always 0x10)
+        FILE_TYPE = (primaryHeader >> 96) & 0xFF                           # File Type
+        TOTAL_HEADER_LEN = (primaryHeader >> 64) & 0xFFFFFFFF              # Total xRIT Header Length
+        DATA_LEN = primaryHeader & 0xFFFFFFFFFFFFFFFF                      # Data Field Length
 
         #print("  Header Length: {} bits ({} bytes)".format(TOTAL_HEADER_LEN, TOTAL_HEADER_LEN/8))
         #print("  Data Length: {} bits ({} bytes)".format(DATA_LEN, DATA_LEN/8))
@@ -358,15 +419,17 @@ class S_PDU:
         
         # Loop through headers until Key header (type 7)
         offset = 0
-        nextHeader = int.from_bytes(self.headerField[offset : offset + 1], byteorder='big')
+        nextHeader, headerLen = unpack_from(">BH", self.headerField, offset)
 
         while nextHeader != 7:
-            offset += int.from_bytes(self.headerField[offset + 1 : offset + 3], byteorder='big')
-            nextHeader = int.from_bytes(self.headerField[offset : offset + 1], byteorder='big')
+            offset += headerLen
+            nextHeader, headerLen = unpack_from(">BH", self.headerField, offset)
 
         # Parse Key header (type 7)
-        keyHLen = int.from_bytes(self.headerField[offset + 1 : offset + 3], byteorder='big')
-        index = self.headerField[offset + 5 : offset + keyHLen]
+        # Index must be immutable bytes for the key dict lookup (the payload
+        # itself may be a bytearray)
+        keyHLen = headerLen
+        index = bytes(self.headerField[offset + 5 : offset + keyHLen])
 
         # Catch wrong key index
         try:
@@ -380,9 +443,8 @@ class S_PDU:
             # Append null bytes to data field to fill last 8 byte DES block
             dFMod8 = len(self.dataField) % 8
             if dFMod8 != 0:
-                for i in range(dFMod8):
-                    self.dataField += b'x00'
-                #print("  Added {} null bytes to fill last DES block".format(dFMod8))
+                self.dataField += bytes(8 - dFMod8)
+                #print("  Added {} null bytes to fill last DES block".format(8 - dFMod8))
 
     def decrypt(self):
         """
@@ -409,14 +471,14 @@ class xRIT:
         Parse xRIT headers
         """
 
-        primaryHeader = self.data[:16]
+        primaryHeader = int.from_bytes(self.data[:16], byteorder='big')
 
         # Header fields
-        self.HEADER_TYPE = get_bits_int(primaryHeader, 0, 8, 128)               # File Counter (always 0x00)
-        self.HEADER_LEN = get_bits_int(primaryHeader, 8, 16, 128)               # Header Length (always 0x10)
-        self.FILE_TYPE = get_bits_int(primaryHeader, 24, 8, 128)                # File Type
-        self.TOTAL_HEADER_LEN = get_bits_int(primaryHeader, 32, 32, 128)        # Total xRIT Header Length
-        self.DATA_LEN = get_bits_int(primaryHeader, 64, 64, 128)                # Data Field Length
+        self.HEADER_TYPE = primaryHeader >> 120                                 # File Counter (always 0x00)
+        self.HEADER_LEN = (primaryHeader >> 104) & 0xFFFF                       # Header Length (always 0x10)
+        self.FILE_TYPE = (primaryHeader >> 96) & 0xFF                           # File Type
+        self.TOTAL_HEADER_LEN = (primaryHeader >> 64) & 0xFFFFFFFF              # Total xRIT Header Length
+        self.DATA_LEN = primaryHeader & 0xFFFFFFFFFFFFFFFF                      # Data Field Length
 
         if self.FILE_TYPE == 0:
             self.FILE_TYPE = "Image Data"
@@ -437,28 +499,16 @@ class xRIT:
 
         # Loop through headers until Annotation Text header (type 4)
         offset = self.HEADER_LEN
-        nextHeader = self.get_next_header(offset)
+        nextHeader, headerLen = unpack_from(">BH", self.data, offset)
 
         while nextHeader != 4:
-            offset += self.get_header_len(offset)
-            nextHeader = self.get_next_header(offset)
-        
+            offset += headerLen
+            nextHeader, headerLen = unpack_from(">BH", self.data, offset)
+
         # Parse Annotation Text header (type 4)
-        athLen = self.get_header_len(offset)
+        athLen = headerLen
         self.FILE_NAME = self.data[offset + 3 : offset + athLen].decode('utf-8')
-    
-    def get_next_header(self, offset):
-        """
-        Returns type of next header
-        """
-        return int.from_bytes(self.data[offset : offset + 1], byteorder='big')
-    
-    def get_header_len(self, offset):
-        """
-        Returns length of current header
-        """
-        return int.from_bytes(self.data[offset + 1 : offset + 3], byteorder='big')
-    
+
     def get_save_path(self, root):
         """
         Parses xRIT file name
@@ -485,9 +535,8 @@ class xRIT:
             segNum = fnameSplit[5][:2]
             fExt = self.FILE_NAME.split(".")[1]
 
-        # Check output directories exist
-        if not os.path.exists("{}/{}".format(root, txDate)): os.mkdir(root + "/" + txDate)
-        if not os.path.exists("{}/{}/{}".format(root, txDate, obMode)): os.mkdir(root + "/" + txDate + "/" + obMode)
+        # Create output directories if they don't exist already
+        os.makedirs("{}/{}/{}".format(root, txDate, obMode), exist_ok=True)
 
         path = "/{}/{}/".format(txDate, obMode)
         return root + path + self.FILE_NAME
@@ -4,10 +4,9 @@ https://github.com/sam210723/COMS-1
 """
 
 import ccsds as CCSDS
-from collections import deque
-from time import sleep
-from threading import Thread
-from tools import CCITT_LUT
+import os
+from queue import Queue
+from threading import Event, Thread
 
 class Demuxer:
     """
@@ -20,7 +19,18 @@ class Demuxer:
         """
         
         # Configure instance globals
-        self.rxq = deque()              # Data receive queue
+        #
+        # The receive ring is single-producer (input source) / single-consumer
+        # (demux core), so no lock is needed: rxTail is only written by the
+        # producer, rxHead only by the consumer, both monotonically, and
+        # occupancy is their difference. Events are only for sleeping.
+        self.rxqLimit = 8192            # Receive ring slot count (~7 MB of VCDUs)
+        self.rxSlots = [bytearray(892) for i in range(self.rxqLimit)]   # Preallocated packet slots
+        self.rxSlotLens = [0] * self.rxqLimit                           # Packet length per slot
+        self.rxHead = 0                 # Packets consumed (consumer-owned)
+        self.rxTail = 0                 # Packets produced (producer-owned)
+        self.rxNotEmpty = Event()       # Wakes consumer after a push
+        self.rxNotFull = Event()        # Wakes producer after a pull
         self.coreReady = False          # Core thread ready state
         self.coreStop = False           # Core thread stop flag
         self.verbose = v                # Verbose output flag
@@ -29,109 +39,161 @@ class Demuxer:
         self.keys = k                   # Decryption keys
         self.channelHandlers = {}       # List of channel handlers
         self.vcduCounter = -1           # VCDU continuity counter
+        self.dumpThread = None          # VCDU dump writer thread
 
-        if downlink == "LRIT":
-            self.coreWait = 54          # Core loop delay in ms for LRIT (108.8ms per packet @ 64 kbps)
-        elif downlink == "HRIT":
-            self.coreWait = 1           # Core loop delay in ms for HRIT (2.2ms per packet @ 3 Mbps)
-
-        # Start core demuxer thread
-        demux_thread = Thread()
-        demux_thread.name = "DEMUX CORE"
-        demux_thread.run = self.demux_core
-        demux_thread.start()
+        # Start core demuxer thread (daemon so it can't block process exit;
+        # stop() joins it so a clean shutdown still drains in-flight work)
+        self.coreThread = Thread(target=self.demux_core, name="DEMUX CORE", daemon=True)
+        self.coreThread.start()
 
     def demux_core(self):
         """
         Distributes VCDUs to channel handlers.
         """
         
+        # Pin this thread to one core so its LUTs and buffers stay cache-hot (Linux only)
+        if hasattr(os, 'sched_setaffinity'):
+            try:
+                os.sched_setaffinity(0, {max(os.sched_getaffinity(0))})
+            except OSError:
+                pass
+
         # Indicate core thread has initialised
         self.coreReady = True
 
         # Thread globals
         lastVCID = None             # Last VCID seen
-        crclut = CCITT_LUT()        # CP_PDU CRC LUT
-
-        # Open VCDU dump file
-        dumpFile = None
+        handler = None              # Channel handler for lastVCID
+        handlerDataIn = None        # Bound data_in method of handler
+        channelHandlers = self.channelHandlers  # Handler dict as local
+        scNames = CCSDS.VCDU.SC_NAMES           # Supported spacecraft names by ID
+        vcNames = CCSDS.VCDU.VC_NAMES           # Virtual Channel names by ID
+        vcidInfo = {}               # Prebuilt VCID change messages by (SCID, VCID)
+        verbose = self.verbose      # Verbose flag as local (keeps attribute lookups out of the hot loop)
+
+        # Open VCDU dump file and start writer thread so disk I/O
+        # never stalls packet processing
+        dumpQueue = None
         if self.dumpPath != None:
-            dumpFile = open(self.dumpPath, 'wb+')
+            self.dumpFile = open(self.dumpPath, 'wb+')
+            self.dumpQueue = Queue(maxsize=1024)
+            dumpQueue = self.dumpQueue
+
+            self.dumpThread = Thread(target=self.dump_writer, name="DUMP WRITER", daemon=True)
+            self.dumpThread.start()
 
         # Thread loop
         while not self.coreStop:
-            # Pull next packet from queue
+            # Pull next packet from queue (blocks until one is available)
             packet = self.pull()
-            
+
             # If queue is not empty
             if packet != None:
-                # Parse VCDU
-                vcdu = CCSDS.VCDU(packet)
+                # Fast path for runs of fill packets (the bulk of an idle downlink):
+                # a bit test on byte 1 recognises fill before the header is decoded
+                if len(packet) >= 6 and (packet[1] & 0x3F) == 63 and lastVCID == 63:
+                    # Check spacecraft is supported
+                    scid = ((packet[0] << 2) | (packet[1] >> 6)) & 0xFF
+                    if scid not in scNames:
+                        if verbose: print("SPACECRAFT \"{}\" NOT SUPPORTED".format(scid))
+                        continue
+
+                    # Check VCDU continuity counter (only fill bytes read past the VCID)
+                    self.continuity(63, int.from_bytes(packet[2:5], byteorder='big'))
+                    continue
+
+                # Decode VCDU header fields in place without building a VCDU object
+                header = int.from_bytes(packet[:6], byteorder='big')
+                scid = (header >> 38) & 0xFF
+                vcid = (header >> 32) & 0x3F
 
-                # Dump raw VCDU to file
-                if dumpFile != None and vcdu.VCID != 63:
-                    dumpFile.write(packet)
+                # Queue raw VCDU for dump writer thread
+                if dumpQueue != None and vcid != 63:
+                    dumpQueue.put(packet)
 
-                # Check spacecraft is supported
-                if vcdu.SC != "COMS-1":
-                    if self.verbose: print("SPACECRAFT \"{}\" NOT SUPPORTED".format(vcdu.SCID))
+                # Check spacecraft is supported (integer ID membership, no string compare)
+                if scid not in scNames:
+                    if verbose: print("SPACECRAFT \"{}\" NOT SUPPORTED".format(scid))
                     continue
 
                 # Check VCDU continuity counter
-                self.continuity(vcdu)
+                self.continuity(vcid, (header >> 8) & 0xFFFFFF)
 
                 # Check for VCID change
-                if lastVCID != vcdu.VCID:
-                    if self.verbose: print()
-                    vcdu.print_info()
-                    lastVCID = vcdu.VCID
+                if lastVCID != vcid:
+                    if verbose: print()
+
+                    # Print VCID change message (formatted once per channel, then cached,
+                    # since packet loss can make these transitions frequent)
+                    info = vcidInfo.get((scid, vcid))
+                    if info == None:
+                        info = "\n[VCID] {} {}: {}".format(scNames[scid], vcid, vcNames.get(vcid))
+                        vcidInfo[(scid, vcid)] = info
+                    print(info)
+                    lastVCID = vcid
+
+                    # Get channel handler for new VCID (cached in a local for the
+                    # long runs of packets on the same channel)
+                    if vcid != 63:
+                        handler = channelHandlers.get(vcid)
+                        if handler == None:
+                            # Create new channel handler instance
+                            handler = Channel(vcid, verbose, self.outputPath, self.keys)
+                            channelHandlers[vcid] = handler
+                            if verbose: print("  CREATED NEW CHANNEL HANDLER\n")
+
+                        # Cache the bound method so the per-packet call skips
+                        # attribute resolution on the handler
+                        handlerDataIn = handler.data_in
 
                 # Discard fill packets
-                if vcdu.VCID == 63:
+                if vcid == 63:
                     continue
-                
-                # Check channel handler for current VCID exists
-                try:
-                    self.channelHandlers[vcdu.VCID]
-                except KeyError:
-                    # Create new channel handler instance
-                    self.channelHandlers[vcdu.VCID] = Channel(vcdu.VCID, self.verbose, crclut, self.outputPath, self.keys)
-                    if self.verbose: print("  CREATED NEW CHANNEL HANDLER\n")
-
-                # Pass VCDU to appropriate channel handler
-                self.channelHandlers[vcdu.VCID].data_in(vcdu)
-                
-            else:
-                # No packet available, sleep thread
-                sleep(self.coreWait / 1000)
-        
+
+                # Pass M_PDU zone to appropriate channel handler
+                handlerDataIn(memoryview(packet)[6:])
+
         # Gracefully exit core thread
         if self.coreStop:
-            if dumpFile != None:
-                dumpFile.close()
-            
+            if dumpQueue != None:
+                # Writer thread closes the dump file on sentinel
+                dumpQueue.put(None)
+
             return
 
-    def continuity(self, vcdu):
+    def dump_writer(self):
+        """
+        Writes queued VCDUs to the dump file (runs on its own thread)
+        """
+
+        while True:
+            packet = self.dumpQueue.get()
+
+            # Stop sentinel from demux core
+            if packet == None:
+                break
+
+            self.dumpFile.write(packet)
+
+        self.dumpFile.close()
+
+    def continuity(self, vcid, counter):
         """
         Checks VCDU packet continuity by comparing packet counters
         """
 
         # If at least one VCDU has been received
         if self.vcduCounter != -1:
-            # Check counter reset
-            if self.vcduCounter == 16777215 and vcdu.COUNTER == 0:
-                self.vcduCounter = vcdu.COUNTER
-                return
-            
-            diff = vcdu.COUNTER - self.vcduCounter - 1
+            # Modular subtract handles the 24 bit counter wrap (16777215 -> 0
+            # gives a diff of 0) without a dedicated reset branch
+            diff = (counter - self.vcduCounter - 1) & 0xFFFFFF
             if diff != 0:
                 if self.verbose:
-                    print("  DROPPED {} PACKETS    (CURRENT: {}   LAST: {}   VCID: {})".format(diff, vcdu.COUNTER, self.vcduCounter, vcdu.VCID))
+                    print("  DROPPED {} PACKETS    (CURRENT: {}   LAST: {}   VCID: {})".format(diff, counter, self.vcduCounter, vcid))
                 else:
                     print("  DROPPED {} PACKETS".format(diff))
-        
-        self.vcduCounter = vcdu.COUNTER
+
+        self.vcduCounter = counter
 
     def push(self, packet):
         """
@@ -139,26 +201,57 @@ class Demuxer:
         :param packet: 892 byte Virtual Channel Data Unit (VCDU)
         """
 
-        self.rxq.append(packet)
+        # Wait for a free ring slot (a stale rxHead only overestimates fullness)
+        while self.rxTail - self.rxHead >= self.rxqLimit:
+            if self.coreStop:
+                return
+
+            # Sleep until the consumer frees a slot (re-check after clear to
+            # avoid missing a wake-up between the test and the wait)
+            self.rxNotFull.clear()
+            if self.rxTail - self.rxHead < self.rxqLimit or self.coreStop:
+                continue
+            self.rxNotFull.wait()
+
+        # Copy packet into preallocated slot, then publish it by advancing rxTail
+        slot = self.rxTail % self.rxqLimit
+        length = len(packet)
+        self.rxSlots[slot][:length] = packet
+        self.rxSlotLens[slot] = length
+
+        self.rxTail += 1
+        self.rxNotEmpty.set()
 
     def pull(self):
         """
-        Pull data from receive queue
+        Pull data from receive ring, blocking until a packet is available
         """
 
-        try:
-            # Return top item
-            return self.rxq.popleft()
-        except IndexError:
-            # Queue empty
-            return None
+        # Wait for a packet to arrive (a stale rxTail only underestimates occupancy)
+        while self.rxTail == self.rxHead:
+            if self.coreStop:
+                return None
+
+            # Sleep until the producer publishes a packet
+            self.rxNotEmpty.clear()
+            if self.rxTail != self.rxHead or self.coreStop:
+                continue
+            self.rxNotEmpty.wait()
+
+        # Copy packet out of slot so the slot can be reused immediately
+        slot = self.rxHead % self.rxqLimit
+        packet = bytes(memoryview(self.rxSlots[slot])[:self.rxSlotLens[slot]])
+
+        self.rxHead += 1
+        self.rxNotFull.set()
+        return packet
 
     def complete(self):
         """
-        Checks if receive queue is empty
+        Checks if receive ring is empty
         """
 
-        if len(self.rxq) == 0:
+        if self.rxTail == self.rxHead:
             return True
         else:
             return False
@@ -169,6 +262,17 @@ class Demuxer:
         """
 
         self.coreStop = True
+        self.rxNotEmpty.set()
+        self.rxNotFull.set()
+
+        # Wait for the core thread to finish its current packet and exit,
+        # otherwise exit() kills the daemon thread mid-save
+        self.coreThread.join()
+
+        # Core has enqueued the stop sentinel by now; wait for the writer
+        # to drain the queue and close the dump file
+        if self.dumpThread != None:
+            self.dumpThread.join()
 
 
 class Channel:
@@ -176,89 +280,91 @@ class Channel:
     Virtual channel data handler
     """
 
-    def __init__(self, vcid, v, crclut, output, k):
+    def __init__(self, vcid, v, output, k):
         """
         Initialises virtual channel data handler
         :param vcid: Virtual Channel ID
         :param v: Verbose output flag
-        :param crclut: CP_PDU CRC LUT
         :param output: xRIT file output path root
         :param k: Decryption keys
         """
 
         self.VCID = vcid            # VCID for this handler
         self.verbose = v            # Verbose output flag
-        self.crclut = crclut        # CP_PDU CRC LUT
         self.outputPath = output    # xRIT file output path root
         self.keys = k               # Decryption keys
         self.cCPPDU = None          # Current CP_PDU object
         self.cTPFile = None         # Current TP_File object
 
 
-    def data_in(self, vcdu):
+    def data_in(self, data):
         """
-        Takes in VCDUs for the channel handler to process
-        :param packet: Parsed VCDU object
+        Takes in the M_PDU zone of a VCDU for the channel handler to process
+        :param data: M_PDU zone of a VCDU (bytes or memoryview)
         """
 
-        # Parse M_PDU
-        mpdu = CCSDS.M_PDU(vcdu.MPDU)
+        # Verbose flag as local (keeps attribute lookups out of the hot path)
+        verbose = self.verbose
+
+        # Parse M_PDU header fields into locals (no M_PDU object per packet)
+        pointer = int.from_bytes(data[:2], byteorder='big') & 0x07FF
+        packet = memoryview(data)[2:]
 
-        # If M_PDU contains CP_PDU header
-        if mpdu.HEADER:
+        # If M_PDU contains CP_PDU header (pointer 0x7FF means headerless)
+        if pointer != 2047:
             # If data preceeds header
-            if mpdu.POINTER != 0:
+            if pointer != 0:
                 # Finish previous CP_PDU
-                preptr = mpdu.PACKET[:mpdu.POINTER]
+                preptr = packet[:pointer]
 
                 try:
-                    lenok, crcok = self.cCPPDU.finish(preptr, self.crclut)
-                    if self.verbose: self.check_CPPDU(lenok, crcok)
+                    lenok, crcok = self.cCPPDU.finish(preptr)
+                    if verbose: self.check_CPPDU(lenok, crcok)
 
                     # Handle finished CP_PDU
                     self.handle_CPPDU(self.cCPPDU)
                 except AttributeError:
-                    if self.verbose: print("  NO CP_PDU TO FINISH (DROPPED PACKETS?)")
+                    if verbose: print("  NO CP_PDU TO FINISH (DROPPED PACKETS?)")
 
                 #TODO: Check CP_PDU continuity
 
                 # Create new CP_PDU
-                postptr = mpdu.PACKET[mpdu.POINTER:]
+                postptr = packet[pointer:]
                 self.cCPPDU = CCSDS.CP_PDU(postptr)
 
                 # Handle CP_PDUs less than one M_PDU in length
                 if 1 < self.cCPPDU.LENGTH < 886 and len(self.cCPPDU.PAYLOAD) > self.cCPPDU.LENGTH:
-                    # Remove trailing null bytes (M_PDU padding)
-                    self.cCPPDU.PAYLOAD = self.cCPPDU.PAYLOAD[:self.cCPPDU.LENGTH]
+                    # Remove trailing null bytes (M_PDU padding) in place
+                    del self.cCPPDU.PAYLOAD[self.cCPPDU.LENGTH:]
                     
                     try:
-                        lenok, crcok = self.cCPPDU.finish(b'', self.crclut)
-                        if self.verbose: self.check_CPPDU(lenok, crcok)
+                        lenok, crcok = self.cCPPDU.finish(b'')
+                        if verbose: self.check_CPPDU(lenok, crcok)
 
                         # Handle finished CP_PDU
                         self.handle_CPPDU(self.cCPPDU)
                     except AttributeError:
-                        if self.verbose: print("  NO CP_PDU TO FINISH (DROPPED PACKETS?)")
+                        if verbose: print("  NO CP_PDU TO FINISH (DROPPED PACKETS?)")
 
             else:
                 # First CP_PDU in TP_File
                 # Create new CP_PDU
-                self.cCPPDU = CCSDS.CP_PDU(mpdu.PACKET)
+                self.cCPPDU = CCSDS.CP_PDU(packet)
 
             # Handle special EOF CP_PDU
             if self.cCPPDU.is_EOF():
                 self.cCPPDU = None
-                if self.verbose: print("  [CP_PDU] EOF MARKER")
+                if verbose: print("  [CP_PDU] EOF MARKER")
             else:
-                if self.verbose:
+                if verbose:
                     self.cCPPDU.print_info()
-                    print("    HEADER:     0x{}".format(hex(mpdu.POINTER)[2:].upper()))
+                    print("    HEADER:     0x{}".format(CCSDS.POINTER_HEX[pointer]))
         else:
             # Append packet to current CP_PDU
             try:
-                self.cCPPDU.append(mpdu.PACKET)
+                self.cCPPDU.append(packet)
             except AttributeError:
-                if self.verbose: print("  NO CP_PDU TO APPEND M_PDU TO (DROPPED PACKETS?)")
+                if verbose: print("  NO CP_PDU TO APPEND M_PDU TO (DROPPED PACKETS?)")
 
     
     def check_CPPDU(self, lenok, crcok):
@@ -268,19 +374,21 @@ class Channel:
 
         # Show length error
         if lenok:
-            print("    LENGTH:     OK")
+            lenInfo = "    LENGTH:     OK"
         else:
             ex = self.cCPPDU.LENGTH
             ac = len(self.cCPPDU.PAYLOAD)
             diff = ac - ex
-            print("    LENGTH:     ERROR (EXPECTED: {}, ACTUAL: {}, DIFF: {})".format(ex, ac, diff))
+            lenInfo = "    LENGTH:     ERROR (EXPECTED: {}, ACTUAL: {}, DIFF: {})".format(ex, ac, diff)
 
         # Show CRC error
         if crcok:
-            print("    CRC:        OK")
+            crcInfo = "    CRC:        OK"
         else:
-            print("    CRC:        ERROR")
-        print()
+            crcInfo = "    CRC:        ERROR"
+
+        # Single write to stdout rather than four separate prints
+        print("{}\n{}\n".format(lenInfo, crcInfo))
 
 
     def handle_CPPDU(self, cppdu):
@@ -293,12 +401,12 @@ class Channel:
             self.cTPFile = CCSDS.TP_File(cppdu.PAYLOAD[:-2])
 
         elif cppdu.SEQ == "CONTINUE":
-            # Add data to TP_File
-            self.cTPFile.append(cppdu.PAYLOAD[:-2])
+            # Add data to TP_File (memoryview avoids copying the payload slice)
+            self.cTPFile.append(memoryview(cppdu.PAYLOAD)[:-2])
 
         elif cppdu.SEQ == "LAST":
             # Close current TP_File
-            lenok = self.cTPFile.finish(cppdu.PAYLOAD[:-2])
+            lenok = self.cTPFile.finish(memoryview(cppdu.PAYLOAD)[:-2])
 
             if self.verbose: self.cTPFile.print_info()
             if lenok:
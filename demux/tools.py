@@ -1,47 +1,45 @@
 import errno
 import os
 
-def get_bits(data, start, length, count):
-    """
-    Get bits from bytes
-
-    :param data: Bytes to get bits from
-    :param start: Start offset in bits
-    :param length: Number of bits to get
-    :param count: Total number of bits in bytes (accounts for leading zeros)
-    """
-
-    dataInt = int.from_bytes(data, byteorder='big')
-    dataBin = format(dataInt, '0' + str(count) + 'b')
-    end = start + length
-    bits = dataBin[start : end]
-
-    return bits
+try:
+    from binascii import crc_hqx
+except ImportError:
+    crc_hqx = None
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
-def get_bits_int(data, start, length, count):
-    """
-    Get bits from bytes as integer
+try:
+    from numba import njit
+except ImportError:
+    njit = None
 
-    :param data: Bytes to get bits from
-    :param start: Start offset in bits
-    :param length: Number of bits to get
-    :param count: Total number of bits in bytes (accounts for leading zeros)
-    """
+# Numba path needs NumPy for the LUT and input views
+if numpy == None:
+    njit = None
 
-    bits = get_bits(data, start, length, count)
 
-    return int(bits, 2)
+# Byte-wide CRC LUT cache (built once, shared by all callers)
+ccittLUT = None
 
 
 def CCITT_LUT():
     """
     Creates Lookup Table for CRC-16/CCITT-FALSE calculation
+
+    The table is built on first call then cached, so every caller shares
+    one table rather than rebuilding 256 entries each time.
     """
 
+    global ccittLUT
+    if ccittLUT != None:
+        return ccittLUT
+
     crcTable = []
     poly = 0x1021
-    
+
     for i in range(256):
         crc = 0
         c = i << 8
@@ -57,4 +55,150 @@ def CCITT_LUT():
 
         crcTable.append(crc)
 
+    ccittLUT = crcTable
+    return crcTable
+
+
+if numpy != None:
+    # Shared uint16 ndarray view of the CRC LUT (512 bytes vs a list of boxed ints)
+    ccittArrayLUT = numpy.array(CCITT_LUT(), dtype=numpy.uint16)
+
+
+def CCITT_NIBBLE_LUT():
+    """
+    Creates 16 entry nibble Lookup Table for CRC-16/CCITT-FALSE calculation
+
+    Two lookups per byte instead of one, but the table fits in a single
+    cache line rather than the 512 bytes of the full byte-wide LUT.
+    """
+
+    crcTable = []
+    poly = 0x1021
+
+    for i in range(16):
+        crc = i << 12
+
+        for j in range(4):
+            if crc & 0x8000:
+                crc = (crc << 1) ^ poly
+            else:
+                crc = crc << 1
+
+            crc = crc & 0xFFFF
+
+        crcTable.append(crc)
+
     return crcTable
+
+
+# Nibble table (built once at import)
+nibbleLUT = CCITT_NIBBLE_LUT()
+
+
+def crc16_nibble(data):
+    """
+    Calculates CRC-16/CCITT-FALSE using the nibble Lookup Table
+
+    :param data: Bytes to calculate CRC over
+    """
+
+    lut = nibbleLUT
+    crc = 0xFFFF
+
+    for byte in data:
+        crc = ((crc << 4) ^ lut[(crc >> 12) ^ (byte >> 4)]) & 0xFFFF
+        crc = ((crc << 4) ^ lut[(crc >> 12) ^ (byte & 0x0F)]) & 0xFFFF
+
+    return crc
+
+
+def CCITT_SLICE_LUT(count):
+    """
+    Creates slice-by-N Lookup Tables for CRC-16/CCITT-FALSE calculation
+
+    Table k gives the CRC contribution of a byte followed by k zero bytes,
+    allowing count input bytes to be folded per loop iteration.
+
+    :param count: Number of tables (bytes folded per iteration)
+    """
+
+    tables = [CCITT_LUT()]
+
+    for k in range(1, count):
+        prev = tables[k - 1]
+        tables.append([((prev[i] << 8) ^ tables[0][prev[i] >> 8]) & 0xFFFF for i in range(256)])
+
+    return tables
+
+
+# Slice-by-16 tables (built once at import)
+slice16LUT = CCITT_SLICE_LUT(16)
+
+
+def crc16_slice16(data):
+    """
+    Calculates CRC-16/CCITT-FALSE using slice-by-16 Lookup Tables
+
+    :param data: Bytes to calculate CRC over
+    """
+
+    (t0, t1, t2, t3, t4, t5, t6, t7,
+     t8, t9, t10, t11, t12, t13, t14, t15) = slice16LUT
+    crc = 0xFFFF
+
+    # Fold 16 bytes per iteration
+    blockEnd = len(data) - (len(data) % 16)
+    for i in range(0, blockEnd, 16):
+        crc = (t15[data[i] ^ (crc >> 8)] ^ t14[data[i + 1] ^ (crc & 0xFF)] ^
+               t13[data[i + 2]] ^ t12[data[i + 3]] ^ t11[data[i + 4]] ^
+               t10[data[i + 5]] ^ t9[data[i + 6]] ^ t8[data[i + 7]] ^
+               t7[data[i + 8]] ^ t6[data[i + 9]] ^ t5[data[i + 10]] ^
+               t4[data[i + 11]] ^ t3[data[i + 12]] ^ t2[data[i + 13]] ^
+               t1[data[i + 14]] ^ t0[data[i + 15]])
+
+    # Process remaining bytes one at a time
+    for i in range(blockEnd, len(data)):
+        crc = ((crc << 8) ^ t0[(crc >> 8) ^ data[i]]) & 0xFFFF
+
+    return crc
+
+
+if njit != None:
+    # nogil lets the CRC run without blocking the producer thread
+    @njit(cache=True, nogil=True)
+    def _crc16_numba_loop(data, lut):
+        crc = 0xFFFF
+
+        for i in range(len(data)):
+            crc = ((crc << 8) ^ lut[(crc >> 8) ^ data[i]]) & 0xFFFF
+
+        return crc
+
+    # Warm up the JIT at import so the first CP_PDU doesn't pay compile time
+    _crc16_numba_loop(numpy.zeros(1, dtype=numpy.uint8), ccittArrayLUT)
+
+
+def crc16_numba(data):
+    """
+    Calculates CRC-16/CCITT-FALSE using a Numba JIT compiled loop
+
+    :param data: Bytes to calculate CRC over
+    """
+
+    return int(_crc16_numba_loop(numpy.frombuffer(data, dtype=numpy.uint8), ccittArrayLUT))
+
+
+def crc16_ccitt(data):
+    """
+    Calculates CRC-16/CCITT-FALSE using the fastest available implementation
+
+    :param data: Bytes to calculate CRC over
+    """
+
+    if crc_hqx != None:
+        return crc_hqx(data, 0xFFFF)
+
+    if njit != None:
+        return crc16_numba(data)
+
+    return crc16_slice16(data)
@@ -0,0 +1,59 @@
+"""
+vcdu-info.py
+https://github.com/sam210723/COMS-1
+
+Summarises a VCDU dump file (packet counts per virtual channel, spacecraft
+IDs and dropped packets) using the bulk header parser.
+"""
+
+from argparse import ArgumentParser
+import ccsds as CCSDS
+
+argp = ArgumentParser()
+argp.description = "Summarises a VCDU dump file"
+argp.add_argument("PATH", action="store", help="Input VCDU dump file")
+args = argp.parse_args()
+
+# Load dump file
+dumpf = open(args.PATH, 'rb')
+data = dumpf.read()
+dumpf.close()
+
+# Parse VCDU headers in bulk
+scids, vcids, counters = CCSDS.parse_vcdu_headers(data)
+
+# Tally spacecraft and virtual channels
+scCount = {}
+vcCount = {}
+for i in range(len(vcids)):
+    scid = int(scids[i])
+    vcid = int(vcids[i])
+    scCount[scid] = scCount.get(scid, 0) + 1
+    vcCount[vcid] = vcCount.get(vcid, 0) + 1
+
+# Tally dropped packets from VCDU counter gaps, skipping unsupported
+# spacecraft IDs (corrupt headers) like the live demuxer continuity check
+dropped = 0
+lastCounter = -1
+for i in range(len(counters)):
+    if int(scids[i]) not in CCSDS.VCDU.SC_NAMES:
+        continue
+
+    counter = int(counters[i])
+    if lastCounter != -1:
+        dropped += (counter - lastCounter - 1) % 16777216
+    lastCounter = counter
+
+print("FILE:             {}".format(args.PATH))
+print("VCDUs:            {}".format(len(vcids)))
+print("DROPPED:          {}\n".format(dropped))
+
+print("SPACECRAFT:")
+for scid in sorted(scCount):
+    name = CCSDS.VCDU.SC_NAMES.get(scid, "UNKNOWN")
+    print("  {} ({}): {}".format(scid, name, scCount[scid]))
+
+print("\nVIRTUAL CHANNELS:")
+for vcid in sorted(vcCount):
+    name = CCSDS.VCDU.VC_NAMES.get(vcid, "UNKNOWN")
+    print("  {} ({}): {}".format(vcid, name, vcCount[vcid]))
@@ -79,33 +79,40 @@ def loop():
     global sck
     global buflen
 
+    # Reusable receive buffer (demux.push copies the packet out synchronously)
+    buffer = bytearray(buflen + 8)
+
     while True:
         if source == "OSP":
-            data = sck.recv(buflen)
-            demux.push(data)
-        
+            # MSG_WAITALL blocks until a whole VCDU has arrived, so TCP
+            # segmentation can't hand the demuxer a fragmented packet
+            nread = sck.recv_into(buffer, buflen, socket.MSG_WAITALL)
+            demux.push(memoryview(buffer)[:nread])
+
         elif source == "GOESRECV":
-            data = sck.recv(buflen + 8)
+            nread = sck.recv_into(buffer, buflen + 8, socket.MSG_WAITALL)
 
-            if len(data) == buflen + 8:
-                demux.push(data[8:])
+            if nread == buflen + 8:
+                demux.push(memoryview(buffer)[8:])
 
         elif source == "FILE":
             global packetf
             global stime
 
             if not packetf.closed:
-                # Read VCDU from file
-                data = packetf.read(buflen)
+                # Read a batch of VCDUs from file (one syscall per 256 packets)
+                data = packetf.read(buflen * 256)
 
                 # No more data to read from file
                 if data == b'':
                     print("INPUT FILE LOADED")
                     packetf.close()
                     continue
-                
-                # Push VCDU to demuxer
-                demux.push(data)
+
+                # Push each VCDU to demuxer
+                view = memoryview(data)
+                for i in range(0, len(data), buflen):
+                    demux.push(view[i : i + buflen])
             else:
                 # Demuxer has all VCDUs from file, wait for processing
                 if demux.complete():
@@ -128,6 +135,9 @@ def config_input():
     if source == "OSP":
         sck = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
 
+        # Request a larger kernel receive buffer to ride out demuxer stalls
+        sck.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1048576)
+
         ip = config.get('osp', 'ip')
         port = int(config.get('osp', 'vchan'))
         addr = (ip, port)
@@ -138,6 +148,9 @@ def config_input():
     elif source == "GOESRECV":
         sck = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
 
+        # Request a larger kernel receive buffer to ride out demuxer stalls
+        sck.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1048576)
+
         ip = config.get('goesrecv', 'ip')
         port = int(config.get('goesrecv', 'vchan'))
         addr = (ip, port)